@@ -3,13 +3,30 @@ Backfill historical option chain data from Trendlyne SmartOptions API.
 This populates the OptionChainData table with today's historical data.
 """
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
+import numpy as np
+import orjson
 from datetime import datetime, timedelta, date
-from database import get_oi_collection, get_stocks_collection, get_tick_data_collection
+from database import get_oi_collection, get_stocks_collection
 
 # Keep a cache to avoid repeated API calls
 STOCK_ID_CACHE = {}
 
+# Keep a cache of MongoDB stock document ids so snapshots skip the find_one round trip
+STOCK_DB_ID_CACHE = {}
+
+# One keep-alive session for every Trendlyne call so TCP/TLS connections are reused
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+))
+# Ask for compressed OI snapshots; bodies are parsed with orjson straight from the raw bytes
+SESSION.headers.update({'Accept-Encoding': 'gzip'})
+
 def get_stock_id_for_symbol(symbol):
     """Automatically lookup Trendlyne stock ID for a given symbol"""
     if symbol in STOCK_ID_CACHE:
@@ -20,9 +37,9 @@ def get_stock_id_for_symbol(symbol):
     
     try:
         print(f"Looking up stock ID for {symbol}...")
-        response = requests.get(search_url, params=params, timeout=10)
+        response = SESSION.get(search_url, params=params, timeout=10)
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         
         if data and 'body' in data and 'data' in data['body'] and len(data['body']['data']) > 0:
             stock_id = data['body']['data'][0]['stock_id']
@@ -38,6 +55,23 @@ def get_stock_id_for_symbol(symbol):
         print(f"[ERROR] Error looking up {symbol}: {e}")
         return None
 
+def get_stock_db_id(symbol, stock_id):
+    """Return the MongoDB _id of the stock document, creating it on first use"""
+    if symbol in STOCK_DB_ID_CACHE:
+        return STOCK_DB_ID_CACHE[symbol]
+
+    stocks_collection = get_stocks_collection()
+    stock = stocks_collection.find_one({'symbol': symbol}, {'_id': 1})
+    if not stock:
+        start_stock = {'symbol': symbol, 'trendlyne_stock_id': stock_id}
+        stocks_collection.insert_one(start_stock)
+        stock_db_id = start_stock['_id'] # Use ObjectId
+    else:
+        stock_db_id = stock['_id']
+
+    STOCK_DB_ID_CACHE[symbol] = stock_db_id
+    return stock_db_id
+
 def backfill_from_trendlyne(symbol, stock_id, expiry_date_str, timestamp_snapshot):
     """Fetch and save historical OI data from Trendlyne for a specific timestamp snapshot"""
     
@@ -51,9 +85,9 @@ def backfill_from_trendlyne(symbol, stock_id, expiry_date_str, timestamp_snapsho
     }
     
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = SESSION.get(url, params=params, timeout=10)
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         
         if data['head']['status'] != '0':
             print(f"[ERROR] API error: {data['head'].get('statusDescription', 'Unknown error')}")
@@ -64,16 +98,9 @@ def backfill_from_trendlyne(symbol, stock_id, expiry_date_str, timestamp_snapsho
         input_data = body.get('inputData', {})
         
         oi_collection = get_oi_collection()
-        stocks_collection = get_stocks_collection()
-
-        # Ensure stock exists in MongoDB
-        stock = stocks_collection.find_one({'symbol': symbol})
-        if not stock:
-            start_stock = {'symbol': symbol, 'trendlyne_stock_id': stock_id}
-            stocks_collection.insert_one(start_stock)
-            stock_db_id = start_stock['_id'] # Use ObjectId
-        else:
-             stock_db_id = stock['_id']
+
+        # Ensure stock exists in MongoDB (resolved once per symbol)
+        stock_db_id = get_stock_db_id(symbol, stock_id)
 
 
         # Use today's date or the date from API
@@ -85,16 +112,13 @@ def backfill_from_trendlyne(symbol, stock_id, expiry_date_str, timestamp_snapsho
         expiry_str = input_data.get('expDateList', [expiry_date_str])[0]
         
         # Calculate Aggregates from the per-strike data
-        total_call_oi = 0
-        total_put_oi = 0
-        total_call_change = 0
-        total_put_change = 0
-
-        for strike_str, strike_data in oi_data.items():
-            total_call_oi += int(strike_data.get('callOi', 0))
-            total_put_oi += int(strike_data.get('putOi', 0))
-            total_call_change += int(strike_data.get('callOiChange', 0))
-            total_put_change += int(strike_data.get('putOiChange', 0))
+        strike_oi = np.fromiter(
+            ((int(d.get('callOi', 0)), int(d.get('putOi', 0)),
+              int(d.get('callOiChange', 0)), int(d.get('putOiChange', 0)))
+             for d in oi_data.values()),
+            dtype=np.dtype('4i8'), count=len(oi_data)
+        )
+        total_call_oi, total_put_oi, total_call_change, total_put_change = strike_oi.sum(axis=0).tolist()
 
         # Construct a document for MongoDB 'oi_data' collection
         doc = {
@@ -142,23 +166,16 @@ if __name__ == "__main__":
     # Use MongoDB stocks collection
     stocks_collection = get_stocks_collection()
     
-    tick_collection = get_tick_data_collection()
-    
-    # Get distinct trading symbols from tick data if stocks collection is empty
-    if stocks_collection.count_documents({}) == 0:
-        print("Stocks collection empty. Fetching symbols from tick_data...")
-        # distinct 'fullFeed.marketFF.marketOHLC.ohlc.0.symbol' is hard.
-        # Check app.py: it uses `collection.distinct('instrumentKey')`
-        # and then maps to symbol.
-        keys = tick_collection.distinct('instrumentKey')
-        # We need to map keys to symbols. 'NSE_FO|41923' -> 'BANKNIFTY'?
-        # For now, let's hardcode the majors or infer.
-        # Actually, let's just use the ones we know or prompt user?
-        # Fallback to defaults
+    # Fall back to default symbols if the stocks collection is empty.
+    # Instrument keys in tick_data ('NSE_FO|41923') cannot be mapped back to
+    # symbols here, so the tick collection is not scanned at all.
+    if stocks_collection.find_one({}, {'_id': 1}) is None:
+        print("Stocks collection empty.")
         symbols = ["NIFTY", "BANKNIFTY", "FINNIFTY"]
         print(f"Using default symbols: {symbols}")
     else:
-        stocks = list(stocks_collection.find({}, {'symbol': 1}))
+        # Project only the symbol and pull large batches to keep getMore round trips low
+        stocks = list(stocks_collection.find({}, {'symbol': 1, '_id': 0}).batch_size(1000))
         symbols = [s['symbol'] for s in stocks if 'symbol' in s]
         if not symbols:
              symbols = ["NIFTY", "BANKNIFTY", "FINNIFTY"]
@@ -197,8 +214,8 @@ if __name__ == "__main__":
         try:
             # Get Expiry
             expiry_url = f"https://smartoptions.trendlyne.com/phoenix/api/fno/get-expiry-dates/?mtype=options&stock_id={stock_id}"
-            resp = requests.get(expiry_url, timeout=10)
-            expiry_data = resp.json()
+            resp = SESSION.get(expiry_url, timeout=10)
+            expiry_data = orjson.loads(resp.content)
             if 'body' in expiry_data and 'expiryDates' in expiry_data['body']:
                 expiry_list = expiry_data['body']['expiryDates']
                 default_expiry = expiry_list[0] # Nearest expiry
@@ -3,20 +3,57 @@ Backfill historical option chain data from Trendlyne SmartOptions API.
 This populates a local SQLite database with today's historical data.
 """
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
+import numpy as np
+import orjson
 from datetime import datetime, timedelta, date
+from concurrent.futures import ThreadPoolExecutor
 import sqlite3
 
 # Keep a cache to avoid repeated API calls
 STOCK_ID_CACHE = {}
 
+# One keep-alive session for every Trendlyne call so TCP/TLS connections are reused
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+))
+# Ask for compressed OI snapshots; bodies are parsed with orjson straight from the raw bytes
+SESSION.headers.update({'Accept-Encoding': 'gzip'})
+
+# Snapshot requests kept in flight at once; bounded to respect Trendlyne rate limits
+MAX_CONCURRENT_REQUESTS = 8
+
+# live-oi-data returns a single cumulative snapshot at maxTime, so each stored row costs
+# one request. Sampling every 5 minutes keeps the intraday OI curve at a fifth of the calls.
+SNAPSHOT_INTERVAL_MINUTES = 5
+
+# Persisted stock IDs older than this are looked up again
+STOCK_ID_MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+
+INSERT_OI_SQL = '''
+    INSERT OR REPLACE INTO oi_data
+    (symbol, date, timestamp, expiry_date, call_oi, put_oi, change_in_call_oi, change_in_put_oi, pcr, source)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
 def init_db(db_name='trendlyne_data.db'):
     """Initializes the SQLite database and creates the table if it doesn't exist."""
     conn = sqlite3.connect(db_name)
     cursor = conn.cursor()
+    # WAL + NORMAL sync: one fsync per transaction checkpoint instead of per commit
+    cursor.execute("PRAGMA journal_mode=WAL;")
+    cursor.execute("PRAGMA synchronous=NORMAL;")
+    cursor.execute("PRAGMA temp_store=MEMORY;")
+    cursor.execute("PRAGMA cache_size=-131072;")
+    # Memory-map the database file so B-tree page reads skip read() syscalls
+    cursor.execute("PRAGMA mmap_size=268435456;")
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS oi_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
             symbol TEXT NOT NULL,
             date TEXT NOT NULL,
             timestamp TEXT NOT NULL,
@@ -27,12 +64,33 @@ def init_db(db_name='trendlyne_data.db'):
             change_in_put_oi INTEGER,
             pcr REAL,
             source TEXT,
-            UNIQUE(symbol, date, timestamp)
+            PRIMARY KEY (symbol, date, timestamp)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stock_ids (
+            symbol TEXT PRIMARY KEY,
+            stock_id INTEGER NOT NULL,
+            updated_ts INTEGER NOT NULL
         )
     ''')
     conn.commit()
     return conn
 
+def load_stock_id_cache(conn, max_age_seconds=STOCK_ID_MAX_AGE_SECONDS):
+    """Warm STOCK_ID_CACHE with stock IDs persisted by earlier runs"""
+    cutoff = int(time.time()) - max_age_seconds
+    rows = conn.execute("SELECT symbol, stock_id FROM stock_ids WHERE updated_ts > ?", (cutoff,))
+    STOCK_ID_CACHE.update(rows)
+
+def save_stock_id(conn, symbol, stock_id):
+    """Persist a looked-up stock ID so later runs skip the search request"""
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO stock_ids (symbol, stock_id, updated_ts) VALUES (?, ?, ?)",
+            (symbol, stock_id, int(time.time()))
+        )
+
 def get_stock_id_for_symbol(symbol):
     """Automatically lookup Trendlyne stock ID for a given symbol"""
     if symbol in STOCK_ID_CACHE:
@@ -43,9 +101,9 @@ def get_stock_id_for_symbol(symbol):
 
     try:
         print(f"Looking up stock ID for {symbol}...")
-        response = requests.get(search_url, params=params, timeout=10)
+        response = SESSION.get(search_url, params=params, timeout=10)
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
 
         if data and 'body' in data and 'data' in data['body'] and len(data['body']['data']) > 0:
             stock_id = data['body']['data'][0]['stock_id']
@@ -61,8 +119,12 @@ def get_stock_id_for_symbol(symbol):
         print(f"[ERROR] Error looking up {symbol}: {e}")
         return None
 
-def backfill_from_trendlyne(conn, symbol, stock_id, expiry_date_str, timestamp_snapshot):
-    """Fetch and save historical OI data from Trendlyne for a specific timestamp snapshot"""
+def backfill_from_trendlyne(symbol, stock_id, expiry_date_str, timestamp_snapshot):
+    """Fetch historical OI data from Trendlyne for a specific timestamp snapshot.
+
+    Returns the aggregated oi_data row as a tuple (None on failure) so the
+    caller can bulk-insert a whole symbol with a single executemany.
+    """
 
     url = f"https://smartoptions.trendlyne.com/phoenix/api/live-oi-data/"
     params = {
@@ -73,13 +135,13 @@ def backfill_from_trendlyne(conn, symbol, stock_id, expiry_date_str, timestamp_s
     }
 
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = SESSION.get(url, params=params, timeout=10)
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
 
         if data['head']['status'] != '0':
             print(f"[ERROR] API error: {data['head'].get('statusDescription', 'Unknown error')}")
-            return
+            return None
 
         body = data['body']
         oi_data = body.get('oiData', {})
@@ -92,27 +154,18 @@ def backfill_from_trendlyne(conn, symbol, stock_id, expiry_date_str, timestamp_s
 
         expiry_str = input_data.get('expDateList', [expiry_date_str])[0]
 
-        total_call_oi = 0
-        total_put_oi = 0
-        total_call_change = 0
-        total_put_change = 0
-
-        for strike_str, strike_data in oi_data.items():
-            total_call_oi += int(strike_data.get('callOi', 0))
-            total_put_oi += int(strike_data.get('putOi', 0))
-            total_call_change += int(strike_data.get('callOiChange', 0))
-            total_put_change += int(strike_data.get('putOiChange', 0))
+        # Sum all four OI columns across strikes in one vectorized pass
+        strike_oi = np.fromiter(
+            ((int(d.get('callOi', 0)), int(d.get('putOi', 0)),
+              int(d.get('callOiChange', 0)), int(d.get('putOiChange', 0)))
+             for d in oi_data.values()),
+            dtype=np.dtype('4i8'), count=len(oi_data)
+        )
+        total_call_oi, total_put_oi, total_call_change, total_put_change = strike_oi.sum(axis=0).tolist()
 
         pcr = total_put_oi / total_call_oi if total_call_oi > 0 else 0
 
-        cursor = conn.cursor()
-        sql = '''
-            INSERT OR REPLACE INTO oi_data
-            (symbol, date, timestamp, expiry_date, call_oi, put_oi, change_in_call_oi, change_in_put_oi, pcr, source)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        '''
-
-        values = (
+        return (
             symbol,
             current_date_str,
             timestamp_snapshot,
@@ -125,11 +178,9 @@ def backfill_from_trendlyne(conn, symbol, stock_id, expiry_date_str, timestamp_s
             'trendlyne_backfill'
         )
 
-        cursor.execute(sql, values)
-        conn.commit()
-
     except Exception as e:
         print(f"[ERROR] Error fetching data for {symbol} at {timestamp_snapshot}: {e}")
+        return None
 
 def generate_time_intervals(start_time="09:15", end_time="15:30", interval_minutes=1):
     """Generate time strings in HH:MM format"""
@@ -148,6 +199,8 @@ if __name__ == "__main__":
     print("=" * 60)
 
     db_conn = init_db()
+    db_cursor = db_conn.cursor()
+    load_stock_id_cache(db_conn)
 
     symbols = ["NIFTY"]
 
@@ -165,20 +218,23 @@ if __name__ == "__main__":
     else:
         end_time_str = now.strftime("%H:%M")
 
-    time_slots = generate_time_intervals(end_time=end_time_str)
+    time_slots = generate_time_intervals(end_time=end_time_str, interval_minutes=SNAPSHOT_INTERVAL_MINUTES)
     print(f"Backfilling for {len(time_slots)} time slots from 09:15 to {end_time_str}")
 
     for symbol in symbols:
+        needs_lookup = symbol not in STOCK_ID_CACHE
         stock_id = get_stock_id_for_symbol(symbol)
         if not stock_id:
             failed += 1
             print(f"Skipping {symbol}: No stock ID found.")
             continue
+        if needs_lookup:
+            save_stock_id(db_conn, symbol, stock_id)
 
         try:
             expiry_url = f"https://smartoptions.trendlyne.com/phoenix/api/fno/get-expiry-dates/?mtype=options&stock_id={stock_id}"
-            resp = requests.get(expiry_url, timeout=10)
-            expiry_data = resp.json()
+            resp = SESSION.get(expiry_url, timeout=10)
+            expiry_data = orjson.loads(resp.content)
             if 'body' in expiry_data and 'expiryDates' in expiry_data['body']:
                 default_expiry = expiry_data['body']['expiryDates'][0]
             else:
@@ -187,9 +243,21 @@ if __name__ == "__main__":
 
             print(f"Backfilling {symbol} (Expiry: {default_expiry})...")
 
-            for i, ts in enumerate(time_slots):
-                backfill_from_trendlyne(db_conn, symbol, stock_id, default_expiry, ts)
-                print(f"  -> Progress: {i+1}/{len(time_slots)} ({ts})", end='\r')
+            # Snapshots are independent, so fetch them concurrently and keep slot order
+            rows = []
+            with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+                results = executor.map(
+                    lambda ts: backfill_from_trendlyne(symbol, stock_id, default_expiry, ts),
+                    time_slots
+                )
+                for i, (ts, row) in enumerate(zip(time_slots, results)):
+                    if row:
+                        rows.append(row)
+                    print(f"  -> Progress: {i+1}/{len(time_slots)} ({ts})", end='\r')
+
+            # One transaction per symbol: commits once on success, rolls back on error
+            with db_conn:
+                db_cursor.executemany(INSERT_OI_SQL, rows)
 
             successful += 1
             print(f"\n[DONE] {symbol} complete.")
@@ -1,7 +1,9 @@
 import sys
 import os
 import argparse
-from datetime import datetime, time as dt_time
+from collections import Counter
+from datetime import datetime
+import numpy as np
 import pandas as pd
 
 # Add the project root to the Python path
@@ -10,6 +12,12 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from trading_bot.main import TradingBot
 import trading_bot.config as config
 
+# Option chains only feed PCR-style aggregates, so one fetch per 5 minutes is enough
+CHAIN_FETCH_INTERVAL_MINUTES = 5
+
+# Backtests keep their own hunter zone cache so they never overwrite the live bot's
+BACKTEST_HUNTER_ZONE_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hunter_zone_cache_backtest.json')
+
 
 class Backtester:
     """
@@ -26,6 +34,7 @@ class Backtester:
         """
         backtest_config = config
         backtest_config.PAPER_TRADING = True  # Force paper trading mode for safety
+        backtest_config.HUNTER_ZONE_CACHE_FILE = BACKTEST_HUNTER_ZONE_CACHE_FILE
         self.trading_bot = TradingBot(config_override=backtest_config)
         print("Forcing PAPER_TRADING mode for backtest.")
 
@@ -68,16 +77,15 @@ class Backtester:
         # 4. Fetch all historical 1-minute candles for the date range
         all_candles = []
         print(f"Fetching historical candle data for all instruments...")
-        for instrument_key in self.trading_bot.config.INSTRUMENTS:
-            try:
-                # Corrected argument order: unit, interval, from_date, to_date
-                candles = self.trading_bot.data_handler.get_historical_candle_data(
-                    instrument_key, 'minutes', '1', from_date_str, to_date_str
-                )
-                if candles:
-                    all_candles.extend([(instrument_key, candle) for candle in candles])
-            except Exception as e:
-                print(f"Could not fetch data for {instrument_key}: {e}")
+        # Corrected argument order: unit, interval, from_date, to_date
+        candles_by_instrument = self.trading_bot.data_handler.get_historical_candle_data_batch(
+            self.trading_bot.config.INSTRUMENTS, 'minutes', '1', from_date_str, to_date_str
+        )
+        # Results come back in instrument order so the stable sort below breaks timestamp
+        # ties exactly as the sequential fetch did.
+        for instrument_key, candles in candles_by_instrument.items():
+            if candles:
+                all_candles.extend([(instrument_key, candle) for candle in candles])
 
 
         if not all_candles:
@@ -89,45 +97,67 @@ class Backtester:
 
         print(f"Fetched {len(all_candles)} total candles for backtesting.")
 
+        # Parse every timestamp in one vectorized pass and ignore data outside of
+        # market hours for a more realistic simulation.
+        candle_times = pd.to_datetime([candle[0] for _, candle in all_candles], format='ISO8601')
+        in_market_hours = candle_times.indexer_between_time('09:15', '15:30')
+        all_candles = [all_candles[i] for i in in_market_hours]
+        candle_times = candle_times[in_market_hours]
+        wall_clock_times = candle_times.tz_localize(None).to_numpy()
+        # Integer buckets of CHAIN_FETCH_INTERVAL_MINUTES (counted from the epoch) used as
+        # option chain cache keys
+        chain_buckets = wall_clock_times.astype('datetime64[m]').astype('int64') // CHAIN_FETCH_INTERVAL_MINUTES
+
         # 4. Iterate through each candle, simulating the passage of time
-        instrument_dfs = {}  # Dictionary to store accumulating dataframes for each instrument
         option_chain_cache = {} # Cache to avoid excessive API calls
-        candle_columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'oi']
-
-        for instrument_key, candle_list in all_candles:
-            candle_timestamp = datetime.fromisoformat(candle_list[0])
-
-            # Ignore data outside of market hours for a more realistic simulation
-            if not dt_time(9, 15) <= candle_timestamp.time() <= dt_time(15, 30):
-                continue
-
-            # Create a dictionary from the list to handle data correctly
-            candle_dict = dict(zip(candle_columns, candle_list))
-
+        candle_dtypes = {
+            'timestamp': 'datetime64[ns]', 'open': 'float64', 'high': 'float64', 'low': 'float64',
+            'close': 'float64', 'volume': 'int64', 'oi': 'int64'
+        }
+        candle_columns = list(candle_dtypes)
+
+        # Preallocate one column buffer per instrument, sized from the sorted candle list.
+        # Each candle becomes an in-place write instead of a pd.concat of the whole history.
+        candle_counts = Counter(instrument_key for instrument_key, _ in all_candles)
+        candle_buffers = {}  # instrument_key -> {column: np.ndarray}
+        buffer_lengths = {}  # instrument_key -> number of candles written so far
+
+        for (instrument_key, candle_list), candle_timestamp, wall_clock_time, cache_key in zip(
+                all_candles, candle_times, wall_clock_times, chain_buckets.tolist()):
             # Update volume cache, mimicking live behavior
-            self.trading_bot.latest_volume_cache[instrument_key] = candle_dict.get('volume', 0)
-
-            # Get or create the DataFrame for the current instrument
-            if instrument_key not in instrument_dfs:
-                instrument_dfs[instrument_key] = pd.DataFrame(columns=candle_columns).astype({
-                    'open': 'float64', 'high': 'float64', 'low': 'float64', 'close': 'float64',
-                    'volume': 'int64', 'oi': 'int64'
-                })
-                instrument_dfs[instrument_key]['timestamp'] = pd.to_datetime(instrument_dfs[instrument_key]['timestamp'])
-
-            # Append the new candle data
-            new_candle_df = pd.DataFrame([candle_dict])
-            instrument_dfs[instrument_key] = pd.concat([instrument_dfs[instrument_key], new_candle_df], ignore_index=True)
-
-            # Ensure timestamp column is in the correct format after concat
-            instrument_dfs[instrument_key]['timestamp'] = pd.to_datetime(instrument_dfs[instrument_key]['timestamp'])
+            self.trading_bot.latest_volume_cache[instrument_key] = candle_list[5] if len(candle_list) > 5 else 0
+
+            # Get or allocate the column buffer for the current instrument
+            if instrument_key not in candle_buffers:
+                candle_buffers[instrument_key] = {
+                    column: np.zeros(candle_counts[instrument_key], dtype=dtype)
+                    for column, dtype in candle_dtypes.items()
+                }
+                buffer_lengths[instrument_key] = 0
+
+            # Write the new candle into the next free row. Timestamps are stored as
+            # exchange wall-clock time, which is all the 5-minute resample relies on.
+            buffer = candle_buffers[instrument_key]
+            row = buffer_lengths[instrument_key]
+            buffer['timestamp'][row] = wall_clock_time
+            # The raw candle list is written positionally; no per-candle dict or
+            # single-row DataFrame is built. Missing trailing fields stay zero.
+            for column, value in zip(candle_columns[1:], candle_list[1:]):
+                buffer[column][row] = value or 0
+            buffer_lengths[instrument_key] = row + 1
+
+            # Wrap the filled prefix of the buffer without copying the columns. The strategy
+            # only adds or replaces columns on this frame, so it is passed without a copy.
+            candle_df = pd.DataFrame(
+                {column: values[:row + 1] for column, values in buffer.items()}, copy=False
+            )
 
             # --- Option Chain Caching ---
-            # Generate a cache key for the current minute
-            cache_key = candle_timestamp.strftime('%Y-%m-%d %H:%M')
-
-            # Fetch and cache the option chain for both Nifty and Bank Nifty if not already in cache for this minute
+            # The cache key is the candle's precomputed integer chain bucket
+            # Fetch and cache the option chain for both Nifty and Bank Nifty if not already in cache for this bucket.
+            # Candles arrive in chronological order, so earlier buckets are never revisited and can be dropped.
             if cache_key not in option_chain_cache:
+                option_chain_cache.clear()
                 option_chain_cache[cache_key] = {}
                 try:
                     nifty_expiry = self.trading_bot.data_handler.expiry_dates.get('NIFTY')
@@ -136,7 +166,7 @@ class Backtester:
                             "NSE_INDEX|Nifty 50", nifty_expiry
                         )
                 except Exception as e:
-                    print(f"Error fetching NIFTY option chain for {cache_key}: {e}")
+                    print(f"Error fetching NIFTY option chain for {candle_timestamp:%Y-%m-%d %H:%M}: {e}")
 
                 try:
                     bn_expiry = self.trading_bot.data_handler.expiry_dates.get('BANKNIFTY')
@@ -145,20 +175,20 @@ class Backtester:
                             "NSE_INDEX|Nifty Bank", bn_expiry
                         )
                 except Exception as e:
-                    print(f"Error fetching BANKNIFTY option chain for {cache_key}: {e}")
+                    print(f"Error fetching BANKNIFTY option chain for {candle_timestamp:%Y-%m-%d %H:%M}: {e}")
 
 
             # --- Pass Cached Data to Strategy ---
             # Use the centralized method to get the symbol for the instrument.
             symbol = self.trading_bot.get_symbol_from_instrument_key(instrument_key)
 
-            # Get the correct option chain from the cache for the current minute.
+            # Get the correct option chain from the cache for the current bucket.
             current_option_chain = option_chain_cache.get(cache_key, {}).get(symbol)
 
             # Execute the strategy with the cumulative DataFrame and the cached option chain
             self.trading_bot.execute_strategy(
                 instrument_key,
-                instrument_dfs[instrument_key].copy(),
+                candle_df,
                 candle_timestamp,
                 option_chain=current_option_chain # Pass cached data
             )
@@ -182,19 +212,15 @@ class Backtester:
             return
 
         total_trades = len(paper_trades)
-        winning_trades = 0
-        losing_trades = 0
-        total_pnl = 0
+
+        # Aggregate PnL statistics in one vectorized pass over the trade PnLs
+        pnls = np.fromiter((trade['pnl'] for trade in paper_trades), dtype=np.float64, count=total_trades)
+        total_pnl = pnls.sum()
+        winning_trades = int((pnls > 0).sum())
+        losing_trades = total_trades - winning_trades
 
         for trade in paper_trades:
-            pnl = trade['pnl']
-            total_pnl += pnl
-            if pnl > 0:
-                winning_trades += 1
-            else:
-                losing_trades += 1
-
-            print(f"Trade: {trade['instrument_key']} | Entry: {trade['entry_price']} | Exit: {trade['exit_price']} | PnL: {pnl:.2f}")
+            print(f"Trade: {trade['instrument_key']} | Entry: {trade['entry_price']} | Exit: {trade['exit_price']} | PnL: {trade['pnl']:.2f}")
 
         win_rate = (winning_trades / total_trades) * 100 if total_trades > 0 else 0
 
@@ -7,8 +7,9 @@ from dotenv import load_dotenv
 # Add project root to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from trading_bot.authentication.auth import UpstoxAuthenticator
+from trading_bot.authentication.auth import get_authenticator
 from trading_bot.utils.data_handler import DataHandler
+from trading_bot.strategy.strategy import sum_option_oi
 
 def collect_and_store_nifty_options_data(api, symbol):
     """
@@ -38,17 +39,7 @@ def collect_and_store_nifty_options_data(api, symbol):
         return
 
     # 3. Process and store the data (including PCR calculation)
-    total_ce_oi = 0
-    total_pe_oi = 0
-
-    for strike_data in option_chain:
-        put_option = strike_data.put_options
-        if put_option and hasattr(put_option, 'market_data') and put_option.market_data and hasattr(put_option.market_data, 'oi'):
-            total_pe_oi += put_option.market_data.oi
-
-        call_option = strike_data.call_options
-        if call_option and hasattr(call_option, 'market_data') and call_option.market_data and hasattr(call_option.market_data, 'oi'):
-            total_ce_oi += call_option.market_data.oi
+    total_pe_oi, total_ce_oi = sum_option_oi(option_chain)
 
     pcr_data = []
     if total_ce_oi > 0:
@@ -91,7 +82,7 @@ def main():
         print("Error: UPSTOX_ACCESS_TOKEN environment variable not set.")
         sys.exit(1)
 
-    authenticator = UpstoxAuthenticator()
+    authenticator = get_authenticator()
     api_client = authenticator._configure_api_client(access_token)
 
     collect_and_store_nifty_options_data(api_client, "NIFTY")
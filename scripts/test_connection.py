@@ -1,5 +1,6 @@
 import os
 import logging
+from operator import itemgetter
 from dotenv import load_dotenv
 import upstox_client
 from upstox_client.rest import ApiException
@@ -7,17 +8,24 @@ from upstox_client.rest import ApiException
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Resolved once at import instead of walking the filesystem for a .env on every call
+_ENV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+
+# Credentials the probe needs, pulled from os.environ in one call
+_get_required_env = itemgetter("UPSTOX_API_KEY", "UPSTOX_API_SECRET", "UPSTOX_ACCESS_TOKEN")
+
 def test_upstox_connection():
     """
     Tests the connection to the Upstox API by fetching the user profile.
     """
-    load_dotenv()
+    load_dotenv(_ENV_PATH)
 
-    api_key = os.getenv("UPSTOX_API_KEY")
-    api_secret = os.getenv("UPSTOX_API_SECRET")
-    access_token = os.getenv("UPSTOX_ACCESS_TOKEN")
+    try:
+        api_key, api_secret, access_token = _get_required_env(os.environ)
+    except KeyError:
+        api_key = api_secret = access_token = None
 
-    if not all([api_key, api_secret, access_token]):
+    if not (api_key and api_secret and access_token):
         logging.error("API key, secret, or access token is missing. Please check your .env file.")
         return
 
@@ -36,14 +44,14 @@ def test_upstox_connection():
         api_response = user_api_instance.get_profile(api_version)
 
         logging.info("Successfully connected to Upstox API.")
-        logging.info(f"User Profile: {api_response.data}")
+        logging.info("User Profile: %s", api_response.data)
 
     except ApiException as e:
-        logging.error(f"Exception when calling UserApi->get_profile: {e}")
+        logging.error("Exception when calling UserApi->get_profile: %s", e)
         if e.status == 401:
             logging.error("Unauthorized. Your access token may be expired or invalid.")
         else:
-            logging.error(f"API Error: {e.body}")
+            logging.error("API Error: %s", e.body)
 
 if __name__ == "__main__":
     test_upstox_connection()
@@ -1,8 +1,25 @@
 import os
 import logging
+import functools
+import threading
 from dotenv import load_dotenv
 import upstox_client
 
+# Upper bound on pooled HTTPS connections kept alive by the shared ApiClient
+CONNECTION_POOL_MAXSIZE = 32
+
+# One ApiClient per process so every API wrapper shares the same urllib3 connection pool
+_API_CLIENT_SINGLETON = None
+_SINGLETON_LOCK = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def _load_env_once():
+    """
+    Loads the .env file once per process and returns a snapshot of the UPSTOX_* settings.
+    """
+    load_dotenv()
+    return {key: value for key, value in os.environ.items() if key.startswith("UPSTOX_")}
+
 class UpstoxAuthenticator:
     """
     Handles the authentication process for the Upstox API.
@@ -11,14 +28,14 @@ class UpstoxAuthenticator:
         """
         Initializes the UpstoxAuthenticator.
         """
-        load_dotenv()
+        self._env = _load_env_once()
         self.api_client = None
 
     def get_api_client(self):
         """
         Authenticates the user and returns an API client instance.
         """
-        access_token = os.getenv("UPSTOX_ACCESS_TOKEN")
+        access_token = self._env.get("UPSTOX_ACCESS_TOKEN")
 
         if access_token:
             self.api_client = self._configure_api_client(access_token)
@@ -31,7 +48,31 @@ class UpstoxAuthenticator:
     def _configure_api_client(self, access_token):
         """
         Configures the API client with the given access token.
+
+        The client and its Configuration are built once per process. A new access token
+        is written onto the existing Configuration, which the client reads per request,
+        so pooled keep-alive connections survive token refreshes.
         """
-        configuration = upstox_client.Configuration()
-        configuration.access_token = access_token
-        return upstox_client.ApiClient(configuration)
+        global _API_CLIENT_SINGLETON
+        client = _API_CLIENT_SINGLETON
+        if client is not None and client.configuration.access_token == access_token:
+            return client
+
+        with _SINGLETON_LOCK:
+            client = _API_CLIENT_SINGLETON
+            if client is None:
+                configuration = upstox_client.Configuration()
+                configuration.access_token = access_token
+                configuration.connection_pool_maxsize = CONNECTION_POOL_MAXSIZE
+                client = upstox_client.ApiClient(configuration)
+                _API_CLIENT_SINGLETON = client
+            elif client.configuration.access_token != access_token:
+                client.configuration.access_token = access_token
+            return client
+
+@functools.lru_cache(maxsize=1)
+def get_authenticator():
+    """
+    Returns the process-wide UpstoxAuthenticator, creating it on first use.
+    """
+    return UpstoxAuthenticator()
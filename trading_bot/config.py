@@ -1,3 +1,5 @@
+import os
+
 # Trading configuration
 INSTRUMENTS = ["NSE_INDEX|Nifty 50", "NSE_INDEX|Nifty Bank"]
 PAPER_TRADING = True
@@ -5,4 +7,7 @@ USE_ADVANCED_VOLUME_ANALYSIS = True
 
 # Strategy thresholds
 SCORE_THRESHOLD = 7
-PROBABILITY_THRESHOLD = 75
\ No newline at end of file
+PROBABILITY_THRESHOLD = 75
+
+# On-disk cache of hunter zones per instrument and previous session (None disables it)
+HUNTER_ZONE_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hunter_zone_cache.json')
@@ -2,9 +2,21 @@ import logging
 import trading_bot.config as config
 import upstox_client
 from upstox_client.rest import ApiException
-import uuid
+import itertools
 from datetime import datetime
 
+# Position direction implied by an entry order's transaction type
+DIRECTION_BY_TRANSACTION_TYPE = {'BUY': 'BULL', 'SELL': 'BEAR'}
+
+class MockOrderResponse:
+    """
+    Minimal stand-in for the SDK order response returned in paper trading mode.
+    """
+    __slots__ = ("order_id",)
+
+    def __init__(self, order_id):
+        self.order_id = order_id
+
 class OrderManager:
     """
     Manages order placement, modification, and cancellation.
@@ -16,32 +28,62 @@ class OrderManager:
         self.api_client = api_client
         self.paper_positions = {}
         self.paper_trades = [] # To store closed trades for analysis
+        self._order_api = None # Lazily created OrderApiV3 wrapper, reused across calls
+        self._paper_order_seq = itertools.count(1) # Paper order IDs only need to be unique in-process
+        self.set_paper_trading(config.PAPER_TRADING)
 
-    def place_order(self, quantity, product, validity, price, instrument_token, order_type, transaction_type, tag=None, timestamp=None):
+    def set_paper_trading(self, paper_trading):
         """
-        Places an order.
+        Routes order calls to the paper or live implementations.
+
+        The choice is bound once here rather than re-reading config.PAPER_TRADING on
+        every call; call this again if the mode changes at runtime.
+        """
+        self.paper_trading = paper_trading
+        if paper_trading:
+            self.place_order = self._place_order_paper
+            self.modify_order = self._modify_order_paper
+            self.cancel_order = self._cancel_order_paper
+            self.place_gtt_order = self._place_gtt_order_paper
+        else:
+            self.place_order = self._place_order_live
+            self.modify_order = self._modify_order_live
+            self.cancel_order = self._cancel_order_live
+            self.place_gtt_order = self._place_gtt_order_live
+
+    def _get_order_api(self):
+        """
+        Returns the OrderApiV3 wrapper for this manager's client, creating it on first use.
         """
-        if config.PAPER_TRADING:
-            order_id = str(uuid.uuid4())
-            entry_time = timestamp if timestamp else datetime.now()
-            logging.info(f"PAPER TRADING: Placing {transaction_type} {order_type} order for {instrument_token}.")
-            self.paper_positions[instrument_token] = {
-                'order_id': order_id,
-                'instrument_key': instrument_token,
-                'transaction_type': transaction_type,
-                'entry_price': price, # In a real scenario, this would be the fill price
-                'entry_time': entry_time,
-                'stop_loss_price': 0, # To be updated later
-                'direction': 'BULL' if transaction_type == 'BUY' else 'BEAR'
-            }
-            # Mock a successful order response object
-            class MockOrderResponse:
-                def __init__(self):
-                    self.order_id = order_id
-            return MockOrderResponse()
+        if self._order_api is None:
+            self._order_api = upstox_client.OrderApiV3(self.api_client)
+        return self._order_api
 
+    def _place_order_paper(self, quantity, product, validity, price, instrument_token, order_type, transaction_type, tag=None, timestamp=None):
+        """
+        Records a simulated order as an open paper position.
+        """
+        order_id = f"PAPER-{next(self._paper_order_seq)}"
+        entry_time = timestamp if timestamp else datetime.now()
+        logging.info("PAPER TRADING: Placing %s %s order for %s.", transaction_type, order_type, instrument_token)
+        self.paper_positions[instrument_token] = {
+            'order_id': order_id,
+            'instrument_key': instrument_token,
+            'transaction_type': transaction_type,
+            'entry_price': price, # In a real scenario, this would be the fill price
+            'entry_time': entry_time,
+            'stop_loss_price': 0, # To be updated later
+            'direction': DIRECTION_BY_TRANSACTION_TYPE.get(transaction_type, 'BEAR')
+        }
+        # Mock a successful order response object
+        return MockOrderResponse(order_id)
+
+    def _place_order_live(self, quantity, product, validity, price, instrument_token, order_type, transaction_type, tag=None, timestamp=None):
+        """
+        Places an order.
+        """
         try:
-            order_api = upstox_client.OrderApiV3(self.api_client)
+            order_api = self._get_order_api()
             body = upstox_client.PlaceOrderV3Request(
                 quantity=quantity,
                 product=product,
@@ -56,22 +98,25 @@ class OrderManager:
                 tag=tag
             )
             order_response = order_api.place_order(body=body)
-            logging.info(f"Order placed successfully: {order_response}")
+            logging.info("Order placed successfully: %s", order_response)
             return order_response
         except ApiException as e:
-            logging.error(f"Exception when calling OrderApiV3->place_order: {e}")
+            logging.error("Exception when calling OrderApiV3->place_order: %s", e)
             return None
 
-    def modify_order(self, order_id, quantity, validity, price, order_type, trigger_price=0):
+    def _modify_order_paper(self, order_id, quantity, validity, price, order_type, trigger_price=0):
         """
-        Modifies an existing order.
+        Simulates modifying an order in paper trading mode.
         """
-        if config.PAPER_TRADING:
-            logging.info(f"PAPER TRADING: Modifying order {order_id}.")
-            return True
+        logging.info("PAPER TRADING: Modifying order %s.", order_id)
+        return True
 
+    def _modify_order_live(self, order_id, quantity, validity, price, order_type, trigger_price=0):
+        """
+        Modifies an existing order.
+        """
         try:
-            order_api = upstox_client.OrderApiV3(self.api_client)
+            order_api = self._get_order_api()
             body = upstox_client.ModifyOrderV3Request(
                 quantity=quantity,
                 validity=validity,
@@ -81,41 +126,47 @@ class OrderManager:
                 trigger_price=trigger_price
             )
             order_response = order_api.modify_order(body=body)
-            logging.info(f"Order modified successfully: {order_response}")
+            logging.info("Order modified successfully: %s", order_response)
             return order_response
         except ApiException as e:
-            logging.error(f"Exception when calling OrderApiV3->modify_order: {e}")
+            logging.error("Exception when calling OrderApiV3->modify_order: %s", e)
             return None
 
-    def cancel_order(self, order_id):
+    def _cancel_order_paper(self, order_id):
         """
-        Cancels an existing order.
+        Simulates cancelling an order in paper trading mode.
         """
-        if config.PAPER_TRADING:
-            logging.info(f"PAPER TRADING: Cancelling order {order_id}.")
-            return True
+        logging.info("PAPER TRADING: Cancelling order %s.", order_id)
+        return True
 
+    def _cancel_order_live(self, order_id):
+        """
+        Cancels an existing order.
+        """
         try:
-            order_api = upstox_client.OrderApiV3(self.api_client)
+            order_api = self._get_order_api()
             order_response = order_api.cancel_order(order_id=order_id)
-            logging.info(f"Order cancelled successfully: {order_response}")
+            logging.info("Order cancelled successfully: %s", order_response)
             return order_response
         except ApiException as e:
-            logging.error(f"Exception when calling OrderApiV3->cancel_order: {e}")
+            logging.error("Exception when calling OrderApiV3->cancel_order: %s", e)
             return None
 
-    def place_gtt_order(self, instrument_token, transaction_type, trigger_price, price, quantity):
+    def _place_gtt_order_paper(self, instrument_token, transaction_type, trigger_price, price, quantity):
         """
-        Places a Good Till Triggered (GTT) order.
+        Simulates a GTT order by recording its trigger as the paper position's stop loss.
         """
-        if config.PAPER_TRADING:
-            logging.info(f"PAPER TRADING: Placing GTT {transaction_type} order for {instrument_token} at trigger price {trigger_price}.")
-            if instrument_token in self.paper_positions:
-                self.paper_positions[instrument_token]['stop_loss_price'] = trigger_price
-            return True
+        logging.info("PAPER TRADING: Placing GTT %s order for %s at trigger price %s.", transaction_type, instrument_token, trigger_price)
+        if instrument_token in self.paper_positions:
+            self.paper_positions[instrument_token]['stop_loss_price'] = trigger_price
+        return True
 
+    def _place_gtt_order_live(self, instrument_token, transaction_type, trigger_price, price, quantity):
+        """
+        Places a Good Till Triggered (GTT) order.
+        """
         try:
-            order_api = upstox_client.OrderApiV3(self.api_client)
+            order_api = self._get_order_api()
             triggered_order = upstox_client.GttOrderV3(
                 transaction_type=transaction_type,
                 product="I",
@@ -132,10 +183,10 @@ class OrderManager:
                 orders=[triggered_order]
             )
             order_response = order_api.place_gtt_order(body=body)
-            logging.info(f"GTT Order placed successfully: {order_response}")
+            logging.info("GTT Order placed successfully: %s", order_response)
             return order_response
         except ApiException as e:
-            logging.error(f"Exception when calling OrderApiV3->place_gtt_order: {e}")
+            logging.error("Exception when calling OrderApiV3->place_gtt_order: %s", e)
             return None
 
     def get_paper_positions(self):
@@ -148,29 +199,29 @@ class OrderManager:
         """
         Closes a paper position and records the trade.
         """
-        if instrument_key in self.paper_positions:
-            position = self.paper_positions[instrument_key]
-
-            # Calculate PnL
-            if position['direction'] == 'BULL': # Long position
-                pnl = exit_price - position['entry_price']
-            else: # Short position
-                pnl = position['entry_price'] - exit_price
-
-            # Create a trade record
-            trade = {
-                'instrument_key': position['instrument_key'],
-                'entry_price': position['entry_price'],
-                'exit_price': exit_price,
-                'pnl': pnl,
-                'entry_time': position['entry_time'],
-                'exit_time': exit_time,
-                'direction': position['direction']
-            }
-            self.paper_trades.append(trade)
-
-            logging.info(f"Paper position closed for {instrument_key}. PnL: {pnl:.2f}")
-            del self.paper_positions[instrument_key]
+        position = self.paper_positions.pop(instrument_key, None)
+        if position is None:
+            return
+
+        # Calculate PnL
+        if position['direction'] == 'BULL': # Long position
+            pnl = exit_price - position['entry_price']
+        else: # Short position
+            pnl = position['entry_price'] - exit_price
+
+        # Create a trade record
+        trade = {
+            'instrument_key': position['instrument_key'],
+            'entry_price': position['entry_price'],
+            'exit_price': exit_price,
+            'pnl': pnl,
+            'entry_time': position['entry_time'],
+            'exit_time': exit_time,
+            'direction': position['direction']
+        }
+        self.paper_trades.append(trade)
+
+        logging.info("Paper position closed for %s. PnL: %.2f", instrument_key, pnl)
 
     def get_all_paper_trades(self):
         """
@@ -1,29 +1,211 @@
+import os
 import time
+import json
+import tempfile
+import atexit
+import queue
 import logging
+from logging.handlers import QueueHandler, QueueListener
+from operator import itemgetter
 from datetime import datetime, timedelta, time as dt_time
+import numpy as np
 import pandas as pd
-from trading_bot.authentication.auth import UpstoxAuthenticator
+from trading_bot.authentication.auth import get_authenticator
 from trading_bot.utils.data_handler import DataHandler
 from trading_bot.execution.execution import OrderManager
 from trading_bot.strategy.strategy import (
     classify_day_type, calculate_microstructure_score, calculate_pcr,
-    calculate_evwma, HunterTrade, P2PTrend, Scalp, MeanReversion, DayType,
-    detect_pocket_pivot_volume, detect_pivot_negative_volume,
-    detect_accumulation, detect_distribution
+    calculate_latest_evwma, HunterTrade, P2PTrend, Scalp, MeanReversion, DayType,
+    detect_vpa_signals
 )
 import trading_bot.config as config
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Create a dedicated logger for trades
+# Create a dedicated logger for trades; its trades.log output is attached by _start_trade_log_listener
 trade_logger = logging.getLogger('trade_logger')
 trade_logger.setLevel(logging.INFO)
-fh = logging.FileHandler('trades.log')
-fh.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s - %(message)s')
-fh.setFormatter(formatter)
-trade_logger.addHandler(fh)
+
+# Queue handler and listener thread that write trade records to trades.log off the trading loop
+_trade_log_handler = None
+_trade_log_listener = None
+
+# Trading session bounds (exchange wall clock), inclusive at both ends
+MARKET_OPEN_TIME = dt_time(9, 15)
+MARKET_CLOSE_TIME = dt_time(15, 30)
+
+# The Hunter Zone covers the previous session from 14:30 onwards (exchange wall-clock HH:MM)
+HUNTER_ZONE_START_TIME = '14:30'
+
+# Number of most recent run dates whose hunter zones are kept in the on-disk cache
+HUNTER_ZONE_CACHE_DAYS = 5
+
+# Column layout of Upstox candles
+CANDLE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'oi']
+_candle_fields = itemgetter(*CANDLE_COLUMNS)
+
+# Spot index of each traded symbol; also the underlying for its option chain
+SPOT_INDEX_BY_SYMBOL = {'NIFTY': "NSE_INDEX|Nifty 50", 'BANKNIFTY': "NSE_INDEX|Nifty Bank"}
+
+def _previous_session_window(candles):
+    """
+    Returns (date, high, low) of the previous session's candles from 14:30 onwards.
+
+    Candle timestamps are time-ordered ISO strings on one UTC offset (Upstox returns them
+    newest first), so the scan walks back from the newest candle, skips the latest session
+    and stops at the previous session's 14:30 candle. date is None when the data holds fewer
+    than two sessions; high and low are None when that session has nothing from 14:30 on.
+    """
+    ordered = candles if candles[0][0] >= candles[-1][0] else reversed(candles)
+    latest_date = previous_date = None
+    high = low = None
+    for candle in ordered:
+        candle_date = candle[0][:10]
+        if latest_date is None:
+            latest_date = candle_date
+        if candle_date == latest_date:
+            continue
+        if previous_date is None:
+            previous_date = candle_date
+        if candle_date != previous_date or candle[0][11:16] < HUNTER_ZONE_START_TIME:
+            break
+        high = candle[2] if high is None else max(high, candle[2])
+        low = candle[3] if low is None else min(low, candle[3])
+    return previous_date, high, low
+
+def _start_trade_log_listener():
+    """
+    Routes trade_logger records through a queue to trades.log, written by a listener thread.
+
+    Starts once per process, when a bot first wires up its modules, and registers
+    _stop_trade_log_listener with atexit so queued records are flushed on exit.
+    """
+    global _trade_log_handler, _trade_log_listener
+    if _trade_log_listener is not None:
+        return
+    fh = logging.FileHandler('trades.log')
+    fh.setLevel(logging.INFO)
+    fh.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+    trade_log_queue = queue.SimpleQueue()
+    _trade_log_handler = QueueHandler(trade_log_queue)
+    _trade_log_listener = QueueListener(trade_log_queue, fh)
+    _trade_log_listener.start()
+    trade_logger.addHandler(_trade_log_handler)
+    atexit.register(_stop_trade_log_listener)
+
+def _stop_trade_log_listener():
+    """
+    Flushes queued trade records to trades.log and stops the listener thread; safe to call twice.
+    """
+    global _trade_log_handler, _trade_log_listener
+    if _trade_log_listener is None:
+        return
+    trade_logger.removeHandler(_trade_log_handler)
+    _trade_log_listener.stop()
+    for handler in _trade_log_listener.handlers:
+        handler.close()
+    _trade_log_handler = _trade_log_listener = None
+
+def _load_hunter_zone_cache(cache_file):
+    """
+    Loads the on-disk hunter zone cache, or an empty one if the file is missing or invalid.
+
+    'sessions' maps each run date to the previous session resolved for every instrument on
+    that date, and 'zones' maps instrument -> previous session date -> {'high', 'low'}.
+    """
+    try:
+        with open(cache_file, 'r') as f:
+            cache = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logging.warning("Ignoring unreadable hunter zone cache %s: %s", cache_file, e)
+        cache = {}
+    if not isinstance(cache, dict):
+        logging.warning("Ignoring malformed hunter zone cache %s.", cache_file)
+        cache = {}
+
+    # Keep only well-formed entries, so a damaged cache just means those zones are recomputed
+    sessions = {}
+    raw_sessions = cache.get('sessions')
+    if isinstance(raw_sessions, dict):
+        for run_date, resolved in raw_sessions.items():
+            if isinstance(resolved, dict):
+                sessions[run_date] = {instrument_key: session_date for instrument_key, session_date in resolved.items()
+                                      if isinstance(session_date, str)}
+    zones = {}
+    raw_zones = cache.get('zones')
+    if isinstance(raw_zones, dict):
+        for instrument_key, by_session in raw_zones.items():
+            if isinstance(by_session, dict):
+                zones[instrument_key] = {session_date: zone for session_date, zone in by_session.items()
+                                         if isinstance(zone, dict) and 'high' in zone and 'low' in zone}
+    return {'sessions': sessions, 'zones': zones}
+
+def _save_hunter_zone_cache(cache_file, cache):
+    """
+    Writes the hunter zone cache, keeping only the HUNTER_ZONE_CACHE_DAYS most recent run dates.
+    """
+    sessions = {run_date: cache['sessions'][run_date]
+                for run_date in sorted(cache['sessions'])[-HUNTER_ZONE_CACHE_DAYS:]}
+    zones = {}
+    for resolved in sessions.values():
+        for instrument_key, session_date in resolved.items():
+            zone = cache['zones'].get(instrument_key, {}).get(session_date)
+            if zone is not None:
+                zones.setdefault(instrument_key, {})[session_date] = zone
+    # Write to a temporary file alongside the cache and swap it in, so an interrupted
+    # write never leaves a truncated cache behind
+    temp_path = None
+    try:
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(cache_file)), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'sessions': sessions, 'zones': zones}, f)
+        os.replace(temp_path, cache_file)
+    except OSError as e:
+        logging.warning("Could not write %s: %s", cache_file, e)
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def _candles_to_frame(candles):
+    """
+    Builds a typed candle DataFrame column by column from Upstox candle records.
+    """
+    columns = dict(zip(CANDLE_COLUMNS, zip(*map(_candle_fields, candles))))
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(list(columns['timestamp']), format='ISO8601'),
+        'open': np.asarray(columns['open'], dtype=np.float64),
+        'high': np.asarray(columns['high'], dtype=np.float64),
+        'low': np.asarray(columns['low'], dtype=np.float64),
+        'close': np.asarray(columns['close'], dtype=np.float64),
+        'volume': np.asarray(columns['volume']),
+        'oi': np.asarray(columns['oi'])
+    }, copy=False)
+
+def _resample_candles(df, minutes):
+    """
+    Aggregates time-ordered 1-minute candles into clock-aligned OHLCV bars of `minutes`.
+
+    Equivalent to df.resample(f'{minutes}min', on='timestamp').agg(...).dropna(), but each
+    bin is a contiguous run of rows, so it is reduced with NumPy instead of per-group pandas.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=['open', 'high', 'low', 'close', 'volume'])
+
+    timestamps = df['timestamp']
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_localize(None)  # Bin on exchange wall-clock minutes
+    bins = timestamps.to_numpy().astype('datetime64[m]').astype(np.int64) // minutes
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    ends = np.r_[starts[1:], len(bins)] - 1
+
+    return pd.DataFrame({
+        'open': df['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(df['high'].to_numpy(), starts),
+        'low': np.minimum.reduceat(df['low'].to_numpy(), starts),
+        'close': df['close'].to_numpy()[ends],
+        'volume': np.add.reduceat(df['volume'].to_numpy(), starts)
+    })
 
 class TradingBot:
     """
@@ -49,6 +231,8 @@ class TradingBot:
         self.open_positions = {}  # Tracks currently open positions
         self.last_processed_timestamp = {}  # Prevents processing the same candle multiple times
         self.latest_volume_cache = {}  # Caches the latest volume for futures contracts
+        self._candle_cache = {}  # (first raw timestamp, parsed DataFrame) of each instrument's session so far
+        self._option_chain_cache = {}  # (underlying, expiry) -> option chain fetched during the current tick
 
 
     def run(self):
@@ -64,13 +248,15 @@ class TradingBot:
             self._initialize_modules()
             self._trading_loop()
         except Exception as e:
-            logging.error(f"An unexpected error occurred in the main run loop: {e}", exc_info=True)
+            logging.error("An unexpected error occurred in the main run loop: %s", e, exc_info=True)
+        finally:
+            _stop_trade_log_listener()
 
     def _authenticate(self):
         """
         Authenticates with the Upstox API.
         """
-        authenticator = UpstoxAuthenticator()
+        authenticator = get_authenticator()
         self.api_client = authenticator.get_api_client()
         if not self.api_client:
             logging.error("Authentication failed. Exiting.")
@@ -81,6 +267,7 @@ class TradingBot:
         """
         Initializes and wires up the necessary components of the bot.
         """
+        _start_trade_log_listener()
         self.data_handler = DataHandler(self.api_client)
         self.order_manager = OrderManager(self.api_client)
 
@@ -118,9 +305,14 @@ class TradingBot:
             if self._is_market_hours(now):
                 self.fetch_and_process_candles()
 
-            # Sleep until the next minute
+            # Sleep until the next minute boundary, measured after this tick's work so a
+            # slow fetch/strategy pass does not push the next tick past the boundary.
             next_minute = (now + timedelta(minutes=1)).replace(second=0, microsecond=0)
-            sleep_duration = (next_minute - now).total_seconds()
+            sleep_duration = (next_minute - datetime.now()).total_seconds()
+            if sleep_duration < 0:
+                # The tick overran its minute; run the next one straight away on the latest candles
+                logging.warning("Tick overran the minute boundary by %.1fs.", -sleep_duration)
+                sleep_duration = 0
             try:
                 time.sleep(sleep_duration)
             except KeyboardInterrupt:
@@ -132,10 +324,17 @@ class TradingBot:
         Called every minute to fetch the latest candle for each instrument,
         prevent duplicate processing, and trigger strategy execution.
         """
-        for instrument_key in self.config.INSTRUMENTS:
+        # Option chains are shared by every instrument on the same underlying, so each one is
+        # fetched at most once per tick.
+        self._option_chain_cache.clear()
+
+        # Fetch every instrument's intraday history concurrently, then process them in
+        # instrument order so strategy state is only ever touched from this thread.
+        candles_by_instrument = self.data_handler.get_intra_day_candle_data_batch(
+            self.config.INSTRUMENTS, 'minutes', '1'
+        )
+        for instrument_key, candles in candles_by_instrument.items():
             try:
-                # Fetches the full intraday history for the instrument.
-                candles = self.data_handler.get_intra_day_candle_data(instrument_key, 'minutes', '1')
                 if not candles:
                     continue
 
@@ -152,14 +351,26 @@ class TradingBot:
                 # Cache the latest volume for potential use in spot index calculations.
                 self.latest_volume_cache[instrument_key] = latest_candle.get('volume', 0)
 
-                # Convert the full history of candles to a DataFrame for indicator calculations.
-                df = pd.DataFrame(candles, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'oi'])
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-                
-                self.execute_strategy(instrument_key, df, candle_timestamp)
+                # Extend the cached DataFrame with only the candles added since the last tick.
+                # The previously last candle is re-read in case it was still forming, and a
+                # different first candle means a new session, so the cache is rebuilt.
+                first_timestamp = candles[0]['timestamp']
+                cached = self._candle_cache.get(instrument_key)
+                if cached is None or cached[0] != first_timestamp or len(candles) < len(cached[1]):
+                    cached_df, new_candles = None, candles
+                else:
+                    kept = len(cached[1]) - 1
+                    cached_df, new_candles = cached[1].iloc[:kept], candles[kept:]
+
+                new_df = _candles_to_frame(new_candles)
+                df = new_df if cached_df is None else pd.concat([cached_df, new_df], ignore_index=True)
+                self._candle_cache[instrument_key] = (first_timestamp, df)
+
+                # Hand over a shallow copy so columns the strategy adds or swaps stay out of the cache.
+                self.execute_strategy(instrument_key, df.copy(deep=False), candle_timestamp)
 
             except Exception as e:
-                logging.error(f"Error processing candles for {instrument_key}: {e}", exc_info=True)
+                logging.error("Error processing candles for %s: %s", instrument_key, e, exc_info=True)
 
 
     def _is_market_hours(self, now):
@@ -172,7 +383,7 @@ class TradingBot:
         Returns:
             bool: True if within market hours, False otherwise.
         """
-        return dt_time(9, 15) <= now.time() <= dt_time(15, 30)
+        return MARKET_OPEN_TIME <= now.time() <= MARKET_CLOSE_TIME
 
     def monitor_stop_loss(self, instrument_key, position, current_price, timestamp):
         """
@@ -190,8 +401,8 @@ class TradingBot:
         if (position['direction'] == 'BULL' and current_price <= stop_loss_price) or \
            (position['direction'] == 'BEAR' and current_price >= stop_loss_price):
 
-            logging.info(f"Stop-loss triggered for {instrument_key} at {current_price}. Closing position.")
-            trade_logger.info(f"EXIT: Stop-loss, {instrument_key}, {position['transaction_type']}, {current_price}")
+            logging.info("Stop-loss triggered for %s at %s. Closing position.", instrument_key, current_price)
+            trade_logger.info("EXIT: Stop-loss, %s, %s, %s", instrument_key, position['transaction_type'], current_price)
 
             # Place the exit order (works for both live and paper trading via OrderManager).
             self.order_manager.place_order(
@@ -220,48 +431,58 @@ class TradingBot:
         to_date = current_datetime.strftime('%Y-%m-%d')
         from_date = (current_datetime - timedelta(days=10)).strftime('%Y-%m-%d')
 
+        # A restart on the same run date reuses the previous session resolved earlier that day,
+        # so the zone stays fixed for the whole trading session
+        cache_file = self.config.HUNTER_ZONE_CACHE_FILE
+        cache = _load_hunter_zone_cache(cache_file) if cache_file else None
+        resolved_sessions = cache['sessions'].get(to_date, {}) if cache else {}
+        pending_instruments = []
         for instrument_key in self.config.INSTRUMENTS:
-            try:
-                # Fetch data for the last 10 days to ensure we get the last trading day
-                candles = self.data_handler.get_historical_candle_data(
-                    instrument_key, 'minutes', '1', from_date, to_date
-                )
+            session_date = resolved_sessions.get(instrument_key)
+            zone = cache['zones'].get(instrument_key, {}).get(session_date) if session_date else None
+            if zone is not None:
+                self.hunter_zone[instrument_key] = zone
+                logging.info("Hunter Zone for %s on %s loaded from cache: %s", instrument_key, session_date, zone)
+            else:
+                pending_instruments.append(instrument_key)
+
+        if not pending_instruments:
+            return
 
+        # Fetch data for the last 10 days to ensure we get the last trading day
+        candles_by_instrument = self.data_handler.get_historical_candle_data_batch(
+            pending_instruments, 'minutes', '1', from_date, to_date
+        )
+
+        for instrument_key, candles in candles_by_instrument.items():
+            try:
                 if not candles:
-                    logging.warning(f"No historical data found for {instrument_key} in the last 10 days.")
+                    logging.warning("No historical data found for %s in the last 10 days.", instrument_key)
                     continue
 
-                # Create DataFrame and process timestamps
-                df = pd.DataFrame(candles, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'oi'])
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-
-                # Get unique dates from the data and sort them in descending order
-                unique_dates = sorted(df['timestamp'].dt.date.unique(), reverse=True)
-
-                # The previous trading day is the second date in the sorted list
-                if len(unique_dates) < 2:
-                    logging.warning(f"Not enough unique trading days to determine the previous day for {instrument_key}.")
+                # The previous trading day is the second most recent date in the data
+                last_trading_day, high, low = _previous_session_window(candles)
+                if last_trading_day is None:
+                    logging.warning("Not enough unique trading days to determine the previous day for %s.", instrument_key)
                     continue
 
-                last_trading_day = unique_dates[1]
-
-                # Filter data for the last trading day
-                last_day_data = df[df['timestamp'].dt.date == last_trading_day]
-
-                # Filter for the last 60 minutes of that day (14:30 onwards)
-                last_60_min_data = last_day_data[last_day_data['timestamp'].dt.time >= dt_time(14, 30)]
-
-                if not last_60_min_data.empty:
+                if high is not None:
                     self.hunter_zone[instrument_key] = {
-                        'high': last_60_min_data['high'].max(),
-                        'low': last_60_min_data['low'].min()
+                        'high': high,
+                        'low': low
                     }
-                    logging.info(f"Hunter Zone for {instrument_key} on {last_trading_day}: {self.hunter_zone[instrument_key]}")
+                    logging.info("Hunter Zone for %s on %s: %s", instrument_key, last_trading_day, self.hunter_zone[instrument_key])
+                    if cache is not None:
+                        cache['sessions'].setdefault(to_date, {})[instrument_key] = last_trading_day
+                        cache['zones'].setdefault(instrument_key, {})[last_trading_day] = self.hunter_zone[instrument_key]
                 else:
-                    logging.warning(f"No data found in the last 60 minutes for {instrument_key} on {last_trading_day}.")
+                    logging.warning("No data found in the last 60 minutes for %s on %s.", instrument_key, last_trading_day)
 
             except Exception as e:
-                logging.error(f"Failed to calculate Hunter Zone for {instrument_key}: {e}", exc_info=True)
+                logging.error("Failed to calculate Hunter Zone for %s: %s", instrument_key, e, exc_info=True)
+
+        if cache is not None:
+            _save_hunter_zone_cache(cache_file, cache)
 
     def execute_strategy(self, instrument_key, df, timestamp, option_chain=None):
         """
@@ -271,12 +492,12 @@ class TradingBot:
         if df.empty:
             return
 
-        logging.info(f"Executing strategy for {instrument_key}...")
+        logging.info("Executing strategy for %s...", instrument_key)
         if instrument_key in self.open_positions:
-            logging.info(f"Position already open for {instrument_key}. Skipping.")
+            logging.info("Position already open for %s. Skipping.", instrument_key)
             return
         if instrument_key not in self.hunter_zone:
-            logging.warning(f"Hunter Zone not available for {instrument_key}. Skipping.")
+            logging.warning("Hunter Zone not available for %s. Skipping.", instrument_key)
             return
         hunter_zone = self.hunter_zone[instrument_key]
         opening_price = df['open'].iloc[0]
@@ -285,58 +506,59 @@ class TradingBot:
 
         # For spot indices (which don't have their own volume), substitute the volume
         # from their corresponding futures contract for more accurate indicator calculations.
-        if instrument_key in ["NSE_INDEX|Nifty 50", "NSE_INDEX|Nifty Bank"] and df['volume'].iloc[-1] == 0:
+        if instrument_key == SPOT_INDEX_BY_SYMBOL.get(symbol) and df['volume'].iloc[-1] == 0:
             future_key = self.data_handler.instrument_mapping.get(symbol, {}).get('future')
             if future_key and future_key in self.latest_volume_cache:
                 future_volume = self.latest_volume_cache[future_key]
-                df.loc[df.index[-1], 'volume'] = future_volume
-                logging.info(f"Substituted volume for {instrument_key} with future volume ({future_volume}) from {future_key}")
+                # Swap in a new volume column rather than writing in place, so a frame that
+                # views caller-owned arrays (e.g. the backtest buffers) is never mutated.
+                volume = df['volume'].to_numpy(copy=True)
+                volume[-1] = future_volume
+                df['volume'] = volume
+                logging.info("Substituted volume for %s with future volume (%s) from %s", instrument_key, future_volume, future_key)
 
         if not symbol or not self.data_handler.expiry_dates.get(symbol):
-            logging.warning(f"Could not determine symbol or expiry for {instrument_key}. Skipping option chain.")
+            logging.warning("Could not determine symbol or expiry for %s. Skipping option chain.", instrument_key)
             return
 
         expiry_date = self.data_handler.expiry_dates[symbol]
 
         # Determine the correct underlying instrument key for the option chain API call
-        underlying_instrument = "NSE_INDEX|Nifty 50" if symbol == 'NIFTY' else "NSE_INDEX|Nifty Bank"
+        underlying_instrument = SPOT_INDEX_BY_SYMBOL.get(symbol)
+        if underlying_instrument is None:
+            logging.warning("No spot index known for symbol %s (%s). Skipping option chain.", symbol, instrument_key)
+            return
 
         if option_chain is None: # Fetch only if not provided (i.e., in live mode)
-            option_chain = self.data_handler.get_option_chain(underlying_instrument, expiry_date)
+            chain_key = (underlying_instrument, expiry_date)
+            option_chain = self._option_chain_cache.get(chain_key)
+            if option_chain is None:
+                option_chain = self.data_handler.get_option_chain(underlying_instrument, expiry_date)
+                self._option_chain_cache[chain_key] = option_chain
 
         if not option_chain:
-            logging.warning(f"Could not fetch option chain for {underlying_instrument} with expiry {expiry_date}. Skipping.")
+            logging.warning("Could not fetch option chain for %s with expiry %s. Skipping.", underlying_instrument, expiry_date)
             return
 
         pcr = calculate_pcr(option_chain)
         day_type = classify_day_type(opening_price, hunter_zone['high'], hunter_zone['low'], pcr)
-        df_1m = calculate_evwma(df.copy(), length=20)
-        evwma_1m = df_1m['evwma'].iloc[-1]
-        evwma_1m_slope = df_1m['evwma_slope'].iloc[-1]
+        evwma_1m, evwma_1m_slope = calculate_latest_evwma(df, length=20)
 
         # Resample to 5-minute timeframe for multi-timeframe analysis.
-        df_5m = df.resample('5min', on='timestamp').agg({
-            'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'
-        }).dropna()
-
-        df_5m = calculate_evwma(df_5m, length=20)
+        df_5m = _resample_candles(df, 5)
 
         # Ensure there is data in the 5-minute dataframe before accessing.
         if df_5m.empty:
-            logging.warning(f"Not enough data to generate 5-minute candles for {instrument_key}. Skipping.")
+            logging.warning("Not enough data to generate 5-minute candles for %s. Skipping.", instrument_key)
             return
 
-        evwma_5m = df_5m['evwma'].iloc[-1]
-        evwma_5m_slope = df_5m['evwma_slope'].iloc[-1]
-        price = df['close'].iloc[-1]
+        evwma_5m, evwma_5m_slope = calculate_latest_evwma(df_5m, length=20)
+        price = df['close'].to_numpy()[-1]
         score = calculate_microstructure_score(price, evwma_1m, evwma_5m, evwma_1m_slope, evwma_5m_slope)
-        logging.info(f"Instrument: {instrument_key}, Day Type: {day_type.value}, Score: {score}")
+        logging.info("Instrument: %s, Day Type: %s, Score: %s", instrument_key, day_type.value, score)
         if self.config.USE_ADVANCED_VOLUME_ANALYSIS:
-            ppv = detect_pocket_pivot_volume(df)
-            pnv = detect_pivot_negative_volume(df)
-            accumulation = detect_accumulation(df)
-            distribution = detect_distribution(df)
-            logging.info(f"VPA Signals: PPV={ppv}, PNV={pnv}, Accumulation={accumulation}, Distribution={distribution}")
+            ppv, pnv, accumulation, distribution = detect_vpa_signals(df)
+            logging.info("VPA Signals: PPV=%s, PNV=%s, Accumulation=%s, Distribution=%s", ppv, pnv, accumulation, distribution)
             if (score > 0 and not (ppv or accumulation)) or \
                (score < 0 and not (pnv or distribution)):
                 logging.info("VPA signals do not confirm the microstructure score. Skipping trade.")
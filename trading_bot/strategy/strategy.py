@@ -1,12 +1,23 @@
 from enum import Enum
 import trading_bot.config as config
 import logging
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
 import pandas_ta as ta
 
 # Create a dedicated logger for trades from the main module
 trade_logger = logging.getLogger('trade_logger')
 
+# ATR multiples used for the stop-loss volatility buffer, per trade type
+STOP_LOSS_ATR_MULTIPLIERS = {"Scalp": 0.7, "Hunter": 1.2, "P2P Trend": 1.5}
+
+# PCR of the most recently seen option chains, keyed by id() and holding the chain itself
+# so the id cannot be reused. The backtester hands the same chain object to every candle
+# in a fetch interval, so its OI only needs summing once.
+_PCR_CACHE_SIZE = 4
+_pcr_cache = {}
+
 class DayType(Enum):
     """
     Enum representing the classification of the market day type.
@@ -122,7 +133,7 @@ class HunterTrade(TacticalTemplate):
             )
 
             if probability_score < config.PROBABILITY_THRESHOLD:
-                logging.info(f"Probability score {probability_score} is below threshold. Skipping trade.")
+                logging.info("Probability score %s is below threshold. Skipping trade.", probability_score)
                 return
 
             direction = 'BULL' if score > 0 else 'BEAR'
@@ -133,14 +144,14 @@ class HunterTrade(TacticalTemplate):
             option_instrument_key = get_atm_option_instrument(option_chain, atm_strike, direction)
 
             if not option_instrument_key:
-                logging.warning(f"Could not find ATM option for {instrument_key} at strike {atm_strike}. Skipping trade.")
+                logging.warning("Could not find ATM option for %s at strike %s. Skipping trade.", instrument_key, atm_strike)
                 return
 
             # Place a market order
             vpa_signal = kwargs.get('vpa_signal')
             timestamp = kwargs.get('timestamp')
-            logging.info(f"Placing Hunter trade for {instrument_key}. Score: {score}, Probability: {probability_score}, VPA: {vpa_signal}")
-            trade_logger.info(f"ENTRY: Hunter, {instrument_key}, {direction}, {price}, {score}, {probability_score}, {vpa_signal}")
+            logging.info("Placing Hunter trade for %s. Score: %s, Probability: %s, VPA: %s", instrument_key, score, probability_score, vpa_signal)
+            trade_logger.info("ENTRY: Hunter, %s, %s, %s, %s, %s, %s", instrument_key, direction, price, score, probability_score, vpa_signal)
             order_response = self.order_manager.place_order(
                 quantity=1,
                 product="I",
@@ -204,8 +215,8 @@ class P2PTrend(TacticalTemplate):
             # Hold the position until the score flips
             if (score > 0 and position['direction'] == "BEAR") or \
                (score < 0 and position['direction'] == "BULL"):
-                logging.info(f"Score flipped for {instrument_key}. Closing position.")
-                trade_logger.info(f"EXIT: P2P Trend, {instrument_key}, {position['direction']}, {price}, {score}")
+                logging.info("Score flipped for %s. Closing position.", instrument_key)
+                trade_logger.info("EXIT: P2P Trend, %s, %s, %s, %s", instrument_key, position['direction'], price, score)
                 timestamp = kwargs.get('timestamp')
                 self.order_manager.place_order(
                     quantity=1,
@@ -235,13 +246,13 @@ class P2PTrend(TacticalTemplate):
             option_instrument_key = get_atm_option_instrument(kwargs.get('option_chain'), atm_strike, direction)
 
             if not option_instrument_key:
-                logging.warning(f"Could not find ATM option for {instrument_key} at strike {atm_strike}. Skipping trade.")
+                logging.warning("Could not find ATM option for %s at strike %s. Skipping trade.", instrument_key, atm_strike)
                 return
 
             vpa_signal = kwargs.get('vpa_signal')
             timestamp = kwargs.get('timestamp')
-            logging.info(f"Placing P2P Trend trade for {instrument_key}. Score: {score}, VPA: {vpa_signal}")
-            trade_logger.info(f"ENTRY: P2P Trend, {instrument_key}, {direction}, {price}, {score}, {vpa_signal}")
+            logging.info("Placing P2P Trend trade for %s. Score: %s, VPA: %s", instrument_key, score, vpa_signal)
+            trade_logger.info("ENTRY: P2P Trend, %s, %s, %s, %s, %s", instrument_key, direction, price, score, vpa_signal)
             order_response = self.order_manager.place_order(
                 quantity=1,
                 product="I",
@@ -313,7 +324,7 @@ class MeanReversion(TacticalTemplate):
         open_positions = kwargs.get('open_positions')
 
         if pd.isna(evwma_1m) or pd.isna(evwma_5m):
-            logging.warning(f"EVWMA values are not available for {instrument_key}. Skipping MeanReversion strategy.")
+            logging.warning("EVWMA values are not available for %s. Skipping MeanReversion strategy.", instrument_key)
             return
 
         if instrument_key in open_positions:
@@ -321,8 +332,8 @@ class MeanReversion(TacticalTemplate):
             # Close the position if the price has reverted to the mean
             if (position['direction'] == "BULL" and price >= evwma_1m) or \
                (position['direction'] == "BEAR" and price <= evwma_1m):
-                logging.info(f"Price reverted for {instrument_key}. Closing position.")
-                trade_logger.info(f"EXIT: Mean Reversion, {instrument_key}, {position['direction']}, {price}")
+                logging.info("Price reverted for %s. Closing position.", instrument_key)
+                trade_logger.info("EXIT: Mean Reversion, %s, %s, %s", instrument_key, position['direction'], price)
                 timestamp = kwargs.get('timestamp')
                 self.order_manager.place_order(
                     quantity=1,
@@ -358,13 +369,13 @@ class MeanReversion(TacticalTemplate):
                 option_instrument_key = get_atm_option_instrument(kwargs.get('option_chain'), atm_strike, direction)
 
                 if not option_instrument_key:
-                    logging.warning(f"Could not find ATM option for {instrument_key} at strike {atm_strike}. Skipping trade.")
+                    logging.warning("Could not find ATM option for %s at strike %s. Skipping trade.", instrument_key, atm_strike)
                     return
 
                 vpa_signal = kwargs.get('vpa_signal')
                 timestamp = kwargs.get('timestamp')
-                logging.info(f"Placing Mean Reversion trade for {instrument_key}. Price: {price}, EVWMA_5m: {evwma_5m}, VPA: {vpa_signal}")
-                trade_logger.info(f"ENTRY: Mean Reversion, {instrument_key}, {direction}, {price}, EVWMA_5m: {evwma_5m}, {vpa_signal}")
+                logging.info("Placing Mean Reversion trade for %s. Price: %s, EVWMA_5m: %s, VPA: %s", instrument_key, price, evwma_5m, vpa_signal)
+                trade_logger.info("ENTRY: Mean Reversion, %s, %s, %s, EVWMA_5m: %s, %s", instrument_key, direction, price, evwma_5m, vpa_signal)
                 order_response = self.order_manager.place_order(
                     quantity=1,
                     product="I",
@@ -400,58 +411,103 @@ class MeanReversion(TacticalTemplate):
                         'direction': direction
                     }
 
+def _option_oi(option):
+    """
+    Returns the open interest of one side of a strike, or 0 when it is unavailable.
+
+    One getattr per level replaces the old truthiness/hasattr chain: a missing option,
+    missing market_data, missing oi or an oi of None all resolve to 0.
+    """
+    market_data = getattr(option, 'market_data', None)
+    return getattr(market_data, 'oi', None) or 0
+
+def sum_option_oi(option_chain):
+    """
+    Returns (total_put_oi, total_call_oi) over every strike of an option chain.
+    """
+    put_oi = np.fromiter((_option_oi(strike_data.put_options) for strike_data in option_chain),
+                         dtype=np.float64, count=len(option_chain))
+    call_oi = np.fromiter((_option_oi(strike_data.call_options) for strike_data in option_chain),
+                          dtype=np.float64, count=len(option_chain))
+    return put_oi.sum().item(), call_oi.sum().item()
+
 def calculate_pcr(option_chain):
     """
     Calculates the Put-Call Ratio (PCR) from the option chain data.
     """
-    total_put_oi = 0
-    total_call_oi = 0
     if not option_chain:
         return 1.0  # Neutral PCR if data is unavailable
 
-    for strike_data in option_chain:
-        if strike_data.put_options and strike_data.put_options.market_data:
-            total_put_oi += strike_data.put_options.market_data.oi or 0
-        if strike_data.call_options and strike_data.call_options.market_data:
-            total_call_oi += strike_data.call_options.market_data.oi or 0
+    cached = _pcr_cache.get(id(option_chain))
+    if cached is not None and cached[0] is option_chain:
+        return cached[1]
+
+    total_put_oi, total_call_oi = sum_option_oi(option_chain)
 
     if total_call_oi == 0:
-        return 100.0  # Assign a high value if no calls, indicating extreme bullishness
+        pcr = 100.0  # Assign a high value if no calls, indicating extreme bullishness
+    else:
+        pcr = total_put_oi / total_call_oi
 
-    return total_put_oi / total_call_oi
+    if len(_pcr_cache) >= _PCR_CACHE_SIZE:
+        _pcr_cache.pop(next(iter(_pcr_cache)))
+    _pcr_cache[id(option_chain)] = (option_chain, pcr)
+    return pcr
 
-def calculate_evwma(df, length=20):
+def calculate_latest_evwma(df, length=20):
     """
-    Calculates the Elastic Volume Weighted Moving Average (EVWMA) and its slope.
-    Dynamically adjusts the lookback period if not enough data is available.
+    Calculates the latest Elastic Volume Weighted Moving Average (EVWMA) value and slope
+    for the candles in df without modifying it.
+
+    Non-numeric volume counts as 0 and gaps in close are forward-filled. The lookback is
+    shortened when fewer than `length` points are available, and both values are NaN when
+    there is not enough data.
     """
-    # Ensure columns exist to prevent KeyErrors
     if df.empty or 'volume' not in df.columns or 'close' not in df.columns:
-        df['evwma'] = pd.NA
-        df['evwma_slope'] = pd.NA
-        return df
+        return np.nan, np.nan
+
+    volume = pd.to_numeric(df['volume'], errors='coerce').fillna(0)
+    close = pd.to_numeric(df['close'], errors='coerce').ffill()
 
-    # Clean data: ensure numeric types and handle missing values
-    df['volume'] = pd.to_numeric(df['volume'], errors='coerce').fillna(0)
-    df['close'] = pd.to_numeric(df['close'], errors='coerce').ffill()
+    evwma = _evwma_arrays(close, volume, length)
+    if evwma is None:
+        return np.nan, np.nan
 
-    # Determine the number of available data points
-    valid_df = df.dropna(subset=['close', 'volume'])
-    n_points = len(valid_df)
+    evwma_values, evwma_slope = evwma
+    return evwma_values[-1], evwma_slope[-1]
+
+def _evwma_arrays(close, volume, length):
+    """
+    Computes EVWMA and slope arrays from cleaned close/volume, or None with under 2 points.
+    """
+    close = close.to_numpy(dtype=np.float64)
+    volume = volume.to_numpy(dtype=np.float64)
 
-    # If not enough data points for a meaningful calculation, return with null columns
+    # Volume has no gaps after cleaning, so only leading missing closes reduce the count
+    n_points = np.count_nonzero(~np.isnan(close))
     if n_points < 2:  # Need at least 2 points to calculate a slope
-        df['evwma'] = pd.NA
-        df['evwma_slope'] = pd.NA
-        return df
+        return None
 
     # Use a shorter length if the number of available points is less than the desired length
-    actual_length = min(n_points, length)
+    evwma = _rolling_vwma(close, volume, min(n_points, length))
+    return evwma, np.diff(evwma, prepend=np.nan)
 
-    # Calculate indicators using the adjusted length
-    df['evwma'] = ta.vwma(close=df['close'], volume=df['volume'], length=actual_length)
-    df['evwma_slope'] = df['evwma'].diff()
-    return df
+def _rolling_vwma(close, volume, length):
+    """
+    Volume-weighted moving average over a trailing window of `length` bars.
+
+    Matches pandas_ta.vwma: NaN until the window fills, and NaN/inf where the
+    window's volume is zero (e.g. spot indices).
+    """
+    vwma = np.full(len(close), np.nan)
+    if len(close) < length:
+        return vwma
+
+    price_volume = sliding_window_view(close * volume, length).sum(axis=1)
+    window_volume = sliding_window_view(volume, length).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vwma[length - 1:] = price_volume / window_volume
+    return vwma
 
 def calculate_microstructure_score(price, evwma_1m, evwma_5m, evwma_1m_slope, evwma_5m_slope):
     """
@@ -483,8 +539,7 @@ def calculate_stop_loss(atr, trade_type, last_swing, direction, entry_price):
     """
     Calculates the stop-loss based on ATR, trade type, and the last swing.
     """
-    multipliers = {"Scalp": 0.7, "Hunter": 1.2, "P2P Trend": 1.5}
-    multiplier = multipliers.get(trade_type, 1.0)
+    multiplier = STOP_LOSS_ATR_MULTIPLIERS.get(trade_type, 1.0)
     volatility_buffer = multiplier * atr if pd.notna(atr) else entry_price * 0.01 # Fallback to 1%
 
     if direction == "BULL":
@@ -522,52 +577,74 @@ def find_recent_swing(df, direction, n=20):
     else: # BEAR
         return df_slice['high'].max()
 
-def detect_pocket_pivot_volume(df, lookback=10):
+def _is_pivot_volume(open_, close, volume, lookback, bullish):
     """
-    Detects Pocket Pivot Volume (PPV).
+    Checks whether the last bar closes up (bullish) or down on more volume than every
+    opposite-direction bar among the previous `lookback` bars.
+    """
+    if len(close) < lookback + 1: return False
+    recent_close = close[-lookback-1:-1]
+    recent_open = open_[-lookback-1:-1]
+    if bullish:
+        if close[-1] <= open_[-1]: return False
+        opposite_bars = recent_close < recent_open
+    else:
+        if close[-1] >= open_[-1]: return False
+        opposite_bars = recent_close > recent_open
+
+    return bool(opposite_bars.any() and volume[-1] > volume[-lookback-1:-1][opposite_bars].max())
+
+def _is_absorption_bar(high, low, volume):
     """
-    if len(df) < lookback + 1: return False
-    latest_bar = df.iloc[-1]
-    if latest_bar['close'] <= latest_bar['open']: return False
+    Checks whether the last bar trades well above average volume on a narrower than average range.
+    """
+    if len(volume) < 2: return False
+    bar_range = high - low
 
-    lookback_df = df.iloc[-lookback-1:-1]
-    down_volume = lookback_df[lookback_df['close'] < lookback_df['open']]['volume']
+    return bool(volume[-1] > volume[:-1].mean() * 1.5 and bar_range[-1] < bar_range[:-1].mean() * 0.7)
 
-    return not down_volume.empty and latest_bar['volume'] > down_volume.max()
+def detect_pocket_pivot_volume(df, lookback=10):
+    """
+    Detects Pocket Pivot Volume (PPV).
+    """
+    return _is_pivot_volume(df['open'].to_numpy(), df['close'].to_numpy(), df['volume'].to_numpy(),
+                            lookback, bullish=True)
 
 def detect_pivot_negative_volume(df, lookback=10):
     """
     Detects Pivot Negative Volume (PNV).
     """
-    if len(df) < lookback + 1: return False
-    latest_bar = df.iloc[-1]
-    if latest_bar['close'] >= latest_bar['open']: return False
-
-    lookback_df = df.iloc[-lookback-1:-1]
-    up_volume = lookback_df[lookback_df['close'] > lookback_df['open']]['volume']
-
-    return not up_volume.empty and latest_bar['volume'] > up_volume.max()
+    return _is_pivot_volume(df['open'].to_numpy(), df['close'].to_numpy(), df['volume'].to_numpy(),
+                            lookback, bullish=False)
 
 def detect_accumulation(df):
     """
     Detects accumulation.
     """
-    if len(df) < 2: return False
-    latest_bar = df.iloc[-1]
-    range_val = latest_bar['high'] - latest_bar['low']
-    avg_range = (df['high'].iloc[:-1] - df['low'].iloc[:-1]).mean()
-    avg_volume = df['volume'].iloc[:-1].mean()
-
-    return latest_bar['volume'] > avg_volume * 1.5 and range_val < avg_range * 0.7 and latest_bar['close'] > latest_bar['open']
+    return (_is_absorption_bar(df['high'].to_numpy(), df['low'].to_numpy(), df['volume'].to_numpy())
+            and bool(df['close'].to_numpy()[-1] > df['open'].to_numpy()[-1]))
 
 def detect_distribution(df):
     """
     Detects distribution.
     """
-    if len(df) < 2: return False
-    latest_bar = df.iloc[-1]
-    range_val = latest_bar['high'] - latest_bar['low']
-    avg_range = (df['high'].iloc[:-1] - df['low'].iloc[:-1]).mean()
-    avg_volume = df['volume'].iloc[:-1].mean()
+    return (_is_absorption_bar(df['high'].to_numpy(), df['low'].to_numpy(), df['volume'].to_numpy())
+            and bool(df['close'].to_numpy()[-1] < df['open'].to_numpy()[-1]))
+
+def detect_vpa_signals(df, lookback=10):
+    """
+    Detects PPV, PNV, accumulation and distribution together.
+
+    Returns the same (ppv, pnv, accumulation, distribution) booleans as the four
+    detect_* functions above, pulling each column out of the frame once and testing
+    the absorption bar shared by accumulation and distribution only once.
+    """
+    open_ = df['open'].to_numpy()
+    close = df['close'].to_numpy()
+    volume = df['volume'].to_numpy()
+    absorbing = _is_absorption_bar(df['high'].to_numpy(), df['low'].to_numpy(), volume)
 
-    return latest_bar['volume'] > avg_volume * 1.5 and range_val < avg_range * 0.7 and latest_bar['close'] < latest_bar['open']
+    return (_is_pivot_volume(open_, close, volume, lookback, bullish=True),
+            _is_pivot_volume(open_, close, volume, lookback, bullish=False),
+            absorbing and bool(close[-1] > open_[-1]),
+            absorbing and bool(close[-1] < open_[-1]))
@@ -13,6 +13,10 @@ import  json
 import upstox_client
 from upstox_client.rest import ApiException
 from upstox_client import MarketDataStreamerV3, ApiClient, Configuration
+from concurrent.futures import ThreadPoolExecutor
+
+# Upstox serves candles one instrument per request; this bounds the concurrent fan-out
+CANDLE_FETCH_WORKERS = 8
 
 class DataHandler:
     """
@@ -27,6 +31,8 @@ class DataHandler:
             api_client: An authenticated Upstox API client instance.
         """
         self.api_client = api_client
+        self._history_api = None  # Lazily created SDK wrappers, reused across calls
+        self._options_api = None
         self.market_data_streamer = None
         self.expiry_dates = {}  # Stores nearest expiry dates for symbols like 'NIFTY'
         self.instrument_mapping = {}  # Stores detailed instrument data for futures and options
@@ -211,12 +217,28 @@ class DataHandler:
             self.instrument_to_symbol_map["NSE_INDEX|Nifty Bank"] = "BANKNIFTY"
             return ["NSE_INDEX|Nifty 50", "NSE_INDEX|Nifty Bank"] + ALL_FNO
 
+    def _get_history_api(self):
+        """
+        Returns the HistoryV3Api wrapper for this handler's client, creating it on first use.
+        """
+        if self._history_api is None:
+            self._history_api = upstox_client.HistoryV3Api(self.api_client)
+        return self._history_api
+
+    def _get_options_api(self):
+        """
+        Returns the OptionsApi wrapper for this handler's client, creating it on first use.
+        """
+        if self._options_api is None:
+            self._options_api = upstox_client.OptionsApi(self.api_client)
+        return self._options_api
+
     def get_historical_candle_data(self, instrument_key:str, interval_unit:str, interval_value:str, from_date:str, to_date:str):
         """
         Fetches historical candle data, choosing the correct API endpoint based on the instrument type.
         """
         try:
-            history_api = upstox_client.HistoryV3Api(self.api_client)
+            history_api = self._get_history_api()
 
             # The API uses get_historical_candle_data1 for both indices and F&O with a date range.
             # get_historical_candle_data is for equities and does not support a 'from_date'.
@@ -242,7 +264,7 @@ class DataHandler:
         Fetches intraday candle data.
         """
         try:
-            history_api = upstox_client.HistoryV3Api(self.api_client)
+            history_api = self._get_history_api()
             api_response = history_api.get_intra_day_candle_data(
                 instrument_key,
                 interval_unit,
@@ -254,13 +276,56 @@ class DataHandler:
             logging.error(f"Exception when calling HistoryV3Api->get_intra_day_candle_data: {e}")
             return None
 
+    def get_historical_candle_data_batch(self, instrument_keys, interval_unit, interval_value, from_date, to_date):
+        """
+        Fetches historical candle data for several instruments concurrently.
+
+        Returns:
+            dict: Maps each instrument key, in input order, to its candles (None on failure).
+        """
+        return self._fetch_candles_concurrently(
+            self.get_historical_candle_data, instrument_keys,
+            interval_unit, interval_value, from_date, to_date
+        )
+
+    def get_intra_day_candle_data_batch(self, instrument_keys, interval_unit, interval_value):
+        """
+        Fetches intraday candle data for several instruments concurrently.
+
+        Returns:
+            dict: Maps each instrument key, in input order, to its candles (None on failure).
+        """
+        return self._fetch_candles_concurrently(
+            self.get_intra_day_candle_data, instrument_keys, interval_unit, interval_value
+        )
+
+    def _fetch_candles_concurrently(self, fetch, instrument_keys, *args):
+        """
+        Runs a per-instrument candle fetch over a thread pool sharing the pooled API client.
+        """
+        instrument_keys = list(instrument_keys)
+        if not instrument_keys:
+            return {}
+
+        workers = min(CANDLE_FETCH_WORKERS, len(instrument_keys))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {key: executor.submit(fetch, key, *args) for key in instrument_keys}
+
+        results = {}
+        for instrument_key, future in futures.items():
+            try:
+                results[instrument_key] = future.result()
+            except Exception as e:
+                logging.error(f"Could not fetch candles for {instrument_key}: {e}")
+                results[instrument_key] = None
+        return results
+
     def get_option_chain(self, instrument_key, expiry_date):
         """
         Fetches the option chain for a given instrument and expiry date.
         """
         try:
-            # Correctly pass the authenticated api_client to the constructor
-            options_api = upstox_client.OptionsApi(self.api_client)
+            options_api = self._get_options_api()
             api_response = options_api.get_put_call_option_chain(instrument_key, expiry_date)
             return api_response.data
         except ApiException as e: